@@ -1,12 +1,76 @@
 import os
-import multiprocessing
-from concurrent.futures import ProcessPoolExecutor, as_completed
 from PIL import Image
 import numpy as np
 from utils import ensure_dir
 from pathlib import Path
 import time
 
+# 扰动值查找表（±1到±3），按随机下标取值，避免每次调用 choice 构造候选数组
+_DELTAS = np.array([-3, -2, -1, 1, 2, 3], dtype=np.int16)
+
+# 扰动概率达到该值后改用伯努利掩码选像素，比无放回抽样更快
+_BERNOULLI_PROB = 0.25
+
+
+def _perturb_pixels(pixels, perturb_prob, visual_debug, rng):
+    """
+    原地扰动uint8像素缓冲区
+
+    参数:
+        pixels: 可写且C连续的uint8数组，形状为 (..., 3)，单帧 (H, W, 3) 或整批帧 (N, H, W, 3)
+        perturb_prob: 像素被扰动的概率(0-1之间)
+        visual_debug: 是否启用可视化调试模式
+        rng: numpy随机数生成器
+    """
+    # 计算总像素数和要扰动的像素数
+    total_pixels = pixels.size // 3
+    num_to_perturb = int(total_pixels * perturb_prob)
+
+    if num_to_perturb == 0:
+        return
+
+    # 生成随机线性索引（避免创建坐标列表）
+    if perturb_prob >= _BERNOULLI_PROB:
+        # 高概率时逐像素掷骰子，省去无放回抽样的开销
+        pixel_indices = np.flatnonzero(
+            rng.random(total_pixels, dtype=np.float32) < perturb_prob
+        )
+        num_to_perturb = pixel_indices.size
+    else:
+        # 抽样数不超过总数的1/20（约5%）时NumPy走Floyd算法，无需 total_pixels 大小的排列缓冲区；
+        # 超过后改为尾部洗牌，会分配 total_pixels 个int64（1080p约17MB）。
+        # 伯努利掩码同样需要 total_pixels 大小的随机数数组（约10MB），且在该区间慢约一倍，
+        # 因此 5%~_BERNOULLI_PROB 之间仍用无放回抽样，以内存换速度；
+        # 下标顺序无关紧要，shuffle=False 省去对结果的二次洗牌
+        pixel_indices = rng.choice(
+            total_pixels, size=num_to_perturb, replace=False, shuffle=False
+        )
+        # 按内存顺序排序，后续的散列读写变成顺序扫描，对缓存和预取更友好
+        # （伯努利分支由 flatnonzero 生成，本身已有序）
+        pixel_indices.sort()
+
+    # 批量生成随机通道索引（0=R, 1=G, 2=B）
+    channels = rng.integers(0, 3, size=num_to_perturb, dtype=np.int8)
+
+    # 批量生成随机扰动值（±1到±3）
+    deltas = _DELTAS[rng.integers(0, 6, size=num_to_perturb, dtype=np.int8)]
+
+    # 将图像展平为1D数组 (total_pixels*3,)，像素下标*3+通道即为标量下标，
+    # 一维 take/put 比 pixels_flat[pixel_indices, channels] 的二维高级索引少一轮下标广播
+    pixels_flat = pixels.reshape(-1)
+    scalar_indices = pixel_indices * 3
+    scalar_indices += channels
+
+    # 只对选中的标量升到int16，原地相加并clip后写回，图像其余部分不再读写
+    values = pixels_flat[scalar_indices].astype(np.int16)
+    values += deltas
+    np.clip(values, 0, 255, out=values)
+    pixels_flat[scalar_indices] = values
+
+    # 可视化调试：标记被扰动的像素
+    if visual_debug:
+        pixels.reshape(-1, 3)[pixel_indices] = [255, 0, 0]  # 红色标记
+
 
 def perturb_blocks(
     image,
@@ -24,46 +88,92 @@ def perturb_blocks(
     返回:
         处理后的图像数据（PIL Image对象）
     """
-    img = image.convert("RGB")
-    width, height = img.size
-    pixels = np.array(img, dtype=np.int16)  # 使用int16避免溢出
+    # 已经是RGB时跳过 convert，避免一次整图复制
+    img = image if image.mode == "RGB" else image.convert("RGB")
+    # np.array 直接得到可写的uint8缓冲区（np.asarray 返回只读视图，仍需复制）
+    # 保持uint8，只有被扰动的标量才升到int16
+    pixels = np.array(img)
+
+    # 每次调用创建一个PCG64生成器（比旧版MT19937更快，且多线程/多进程间互不共享状态）
+    rng = np.random.default_rng()
+    _perturb_pixels(pixels, perturb_prob, visual_debug, rng)
+
+    return Image.fromarray(pixels)
+
+
+def _read_frame(reader, buffer):
+    """从二进制流中读满一帧到 buffer，流结束（含不完整的尾帧）时返回 False"""
+    filled = 0
+    size = len(buffer)
+    while filled < size:
+        n = reader.readinto(buffer[filled:])
+        if not n:
+            return False
+        filled += n
+    return True
+
+
+def process_raw_stream(
+    reader,
+    writer,
+    width,
+    height,
+    perturb_prob=0.01,
+    visual_debug=False,
+    progress_callback=None,
+    total_frames=0,
+    batch_size=8,
+):
+    """
+    对原始RGB帧流（如 ffmpeg -f rawvideo -pix_fmt rgb24 的输出）逐批扰动并写出
 
-    # 计算总像素数和要扰动的像素数
-    total_pixels = width * height
-    num_to_perturb = int(total_pixels * perturb_prob)
-    
-    if num_to_perturb == 0:
-        return Image.fromarray(pixels.astype(np.uint8))
+    帧直接读入预分配的 (batch_size, height, width, 3) 缓冲区，逐帧原地扰动后整批写出，
+    不经过任何图片编解码和中间文件
 
-    # 生成随机线性索引（避免创建坐标列表）
-    pixel_indices = np.random.choice(total_pixels, size=num_to_perturb, replace=False)
-    
-    # 将图像reshape为2D数组 (height*width, 3)，每行是一个像素的RGB
-    pixels_flat = pixels.reshape(-1, 3)
-    
-    # 批量生成随机通道索引（0=R, 1=G, 2=B）
-    channels = np.random.randint(0, 3, size=num_to_perturb)
-    
-    # 批量生成随机扰动值（±1到±3）
-    deltas = np.random.choice([-3, -2, -1, 1, 2, 3], size=num_to_perturb)
-    
-    # 使用高级索引一次性修改所有选中的像素
-    # pixels_flat[pixel_indices, channels] 选择要修改的像素和通道
-    pixels_flat[pixel_indices, channels] += deltas
-    
-    # 使用clip确保值在0-255范围内（向量化操作）
-    pixels_flat = np.clip(pixels_flat, 0, 255)
-    
-    # 转换回原始形状和uint8类型
-    perturbed_pixels = pixels_flat.reshape(height, width, 3).astype(np.uint8)
-    
-    # 可视化调试：标记被扰动的像素
-    if visual_debug:
-        # 将线性索引转换为坐标
-        y_coords, x_coords = np.unravel_index(pixel_indices, (height, width))
-        perturbed_pixels[y_coords, x_coords] = [255, 0, 0]  # 红色标记
+    参数:
+        reader: 输入二进制流（支持 readinto，如解码进程的 stdout）
+        writer: 输出二进制流（如编码进程的 stdin）
+        width: 帧宽度
+        height: 帧高度
+        perturb_prob: 像素被扰动的概率(0-1之间，默认0.01即1%)
+        visual_debug: 是否启用可视化调试模式
+        progress_callback: 进度回调函数，接收参数 (current: int, total: int, info: str) -> None
+        total_frames: 预计总帧数，仅用于进度显示
+        batch_size: 每批处理的帧数
 
-    return Image.fromarray(perturbed_pixels)
+    返回:
+        int: 实际处理的帧数
+    """
+    frame_size = width * height * 3
+    batch = np.empty((batch_size, height, width, 3), dtype=np.uint8)
+    batch_view = memoryview(batch).cast("B")
+    rng = np.random.default_rng()
+
+    processed = 0
+    while True:
+        count = 0
+        while count < batch_size and _read_frame(
+            reader, batch_view[count * frame_size : (count + 1) * frame_size]
+        ):
+            count += 1
+        if count == 0:
+            break
+
+        # 逐帧抽样：与单张图片的扰动规则一致，抽样分支的阈值也是按单帧调优的；
+        # 整批作为一个总体抽样时，无放回抽样会分配整批像素数大小的下标数组
+        for frame in batch[:count]:
+            _perturb_pixels(frame, perturb_prob, visual_debug, rng)
+        writer.write(batch_view[: count * frame_size])
+
+        processed += count
+        if progress_callback:
+            total = max(total_frames, processed)
+            progress_callback(processed, total, "处理帧图像")
+
+        if count < batch_size:
+            break
+
+    return processed
 
 
 def process_image(
@@ -94,96 +204,6 @@ def process_image(
     perturbed_img.save(output_path)
 
 
-def _process_single_file_worker(args):
-    """
-    子进程工作函数：只处理图片
-
-    参数:
-        args: (image_file, input_folder, output_folder, perturb_prob, visual_debug)
-
-    返回:
-        (success: bool, image_file: str, error: str or None)
-    """
-    (
-        image_file,
-        input_folder,
-        output_folder,
-        perturb_prob,
-        visual_debug,
-    ) = args
-
-    try:
-        input_path = os.path.join(input_folder, image_file)
-        output_path = os.path.join(output_folder, image_file)
-
-        img = Image.open(input_path)
-        perturbed_img = perturb_blocks(
-            img, perturb_prob, visual_debug
-        )
-        perturbed_img.save(output_path)
-
-        return (True, image_file, None)
-    except Exception as e:
-        return (False, image_file, str(e))
-
-
-def process_folder(
-    input_folder,
-    output_folder,
-    perturb_prob=0.01,
-    visual_debug=False,
-    progress_callback=None,
-    max_workers=4,
-):
-    """
-    批量处理文件夹中的所有图片
-
-    参数:
-        input_folder: 输入图像文件夹路径
-        output_folder: 输出图像文件夹路径
-        perturb_prob: 像素被扰动的概率(0-1之间，默认0.01即1%)
-        visual_debug: 是否启用可视化调试模式
-        progress_callback: 进度回调函数，接收参数 (current: int, total: int, info: str) -> None
-        max_workers: 最大工作进程数，默认使用CPU核心数
-    """
-    ensure_dir(output_folder)
-
-    image_files = [
-        f
-        for f in os.listdir(input_folder)
-        if f.endswith((".png", ".jpg", ".jpeg", ".bmp", ".gif"))
-    ]
-    total = len(image_files)
-
-    if total == 0:
-        return
-
-    if max_workers is None:
-        max_workers = max(1, multiprocessing.cpu_count() - 2)
-
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        future_to_file = {
-            executor.submit(
-                _process_single_file_worker,
-                (
-                    image_file,
-                    input_folder,
-                    output_folder,
-                    perturb_prob,
-                    visual_debug,
-                ),
-            ): image_file
-            for image_file in image_files
-        }
-
-        completed_count = 0
-        for future in as_completed(future_to_file):
-            future.result()  # 等待任务完成并捕获异常
-            completed_count += 1
-            if progress_callback:
-                progress_callback(min(completed_count, total), total, "处理帧图像")
-
-
 if __name__ == "__main__":
     BASE = Path(__file__).parent
     # ========== 测试配置（请填入你的测试路径）==========
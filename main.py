@@ -2,10 +2,11 @@ import os
 import uuid
 import asyncio
 import json
+import shutil
 from contextlib import asynccontextmanager
 from collections import defaultdict
 from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, StreamingResponse
 from PIL import Image
@@ -24,7 +25,7 @@ CPU_COUNT = multiprocessing.cpu_count()
 # 建议：CPU核心数的 1-1.5 倍（因为图片处理快，可以快速释放资源）
 image_max_workers = max(4, min(CPU_COUNT, 12))
 
-# 视频处理：需要严格控制，因为每个视频内部还会启动多进程
+# 视频处理：需要严格控制，因为每个视频内部的FFmpeg解码和编码还会各自启动多线程
 # 建议：根据CPU核心数动态调整
 # - 4核以下：1个
 # - 4-8核：2个
@@ -80,6 +81,28 @@ ensure_dir(TEMP_DIR)
 # 任务进度存储
 task_progress = defaultdict(dict)
 
+# 任务进度变化通知：task_id -> (事件循环, 订阅者Event集合)，SSE 等待事件而不是轮询；
+# 每个SSE连接各自持有一个Event，互相清除不会吞掉对方的通知
+task_events = {}
+
+# SSE 心跳间隔（秒），长时间没有进度变化时发送注释行保持连接
+SSE_HEARTBEAT_SECONDS = 15
+
+
+def _wake_subscribers(subscribers: set):
+    """唤醒某个任务的全部SSE连接（在事件循环线程中执行）"""
+    for event in subscribers:
+        event.set()
+
+
+def _notify_progress(task_id: str):
+    """通知等待中的SSE连接进度已变化（可在任意线程调用）"""
+    waiter = task_events.get(task_id)
+    if waiter is not None:
+        loop, subscribers = waiter
+        # 订阅者集合只在事件循环线程中读写，这里不直接遍历
+        loop.call_soon_threadsafe(_wake_subscribers, subscribers)
+
 
 def _process_image_sync(
     contents: bytes,
@@ -103,8 +126,7 @@ def _process_image_sync(
         processed_img.save(output, format="PNG")
         media_type = "image/png"
 
-    output.seek(0)
-    return output.read(), media_type
+    return output.getvalue(), media_type
 
 
 @app.post("/process_image")
@@ -137,9 +159,9 @@ async def process_image_api(
                 visual_debug,
             )
 
-            # 返回处理后的图片
-            return StreamingResponse(
-                io.BytesIO(result_data),
+            # 返回处理后的图片（一次性写出，无需再包一层BytesIO分块流式发送）
+            return Response(
+                content=result_data,
                 media_type=media_type,
                 headers={
                     "Content-Disposition": f"attachment; filename=processed_{file.filename}"
@@ -149,6 +171,12 @@ async def process_image_api(
             raise HTTPException(status_code=500, detail=f"处理图片时出错: {str(e)}")
 
 
+def _save_upload_sync(src, path: str):
+    """同步保存上传文件（在线程池中执行），按块复制，不把整个文件读入内存"""
+    with open(path, "wb") as f:
+        shutil.copyfileobj(src, f, 1024 * 1024)
+
+
 def _process_video_sync(
     input_path: str,
     output_path: str,
@@ -160,15 +188,23 @@ def _process_video_sync(
 
     def progress_callback(current, total, info):
         if task_id in task_progress:
-            task_progress[task_id].update(
+            progress = task_progress[task_id]
+            percent = int((current / total) * 100) if total > 0 else 0
+            # 只有百分比或阶段变化时才唤醒SSE，避免逐帧推送
+            changed = (
+                progress.get("progress") != percent or progress.get("info") != info
+            )
+            progress.update(
                 {
                     "current": current,
                     "total": total,
                     "info": info,
                     "status": "processing",
-                    "progress": int((current / total) * 100) if total > 0 else 0,
+                    "progress": percent,
                 }
             )
+            if changed:
+                _notify_progress(task_id)
 
     try:
         result = process_video(
@@ -177,7 +213,8 @@ def _process_video_sync(
             perturb_prob=perturb_prob,
             visual_debug=visual_debug,
             progress_callback=progress_callback,
-            max_workers=None,
+            # 多个视频并行时平分CPU核心，避免FFmpeg线程过度超订
+            max_workers=max(1, CPU_COUNT // video_max_workers),
         )
 
         if not result["success"]:
@@ -188,11 +225,13 @@ def _process_video_sync(
             task_progress[task_id]["status"] = "completed"
             task_progress[task_id]["progress"] = 100
             task_progress[task_id]["metadata"] = result.get("metadata", {})
+            _notify_progress(task_id)
 
     except Exception as e:
         if task_id in task_progress:
             task_progress[task_id]["status"] = "error"
             task_progress[task_id]["error"] = str(e)
+            _notify_progress(task_id)
         raise
     finally:
         # 处理完成后清理输入文件（输出文件保留供下载）
@@ -226,6 +265,10 @@ async def _process_video_async(
         if task_id in task_progress:
             task_progress[task_id]["status"] = "error"
             task_progress[task_id]["error"] = str(e)
+            _notify_progress(task_id)
+    finally:
+        # 任务结束后不再有进度变化，已订阅的连接仍持有各自的Event
+        task_events.pop(task_id, None)
 
 
 @app.post("/process_video")
@@ -255,10 +298,14 @@ async def process_video_api(
                 "output_path": output_path,
                 "filename": file.filename,
             }
+            # 订阅者的Event在事件循环线程中创建，工作线程通过 call_soon_threadsafe 触发
+            task_events[task_id] = (asyncio.get_running_loop(), set())
 
-            with open(input_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            # 在线程池中写盘，避免大文件写入阻塞事件循环
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(
+                None, _save_upload_sync, file.file, input_path
+            )
 
             task_progress[task_id]["status"] = "processing"
             task_progress[task_id]["info"] = "开始处理..."
@@ -290,6 +337,8 @@ async def process_video_api(
             if task_id in task_progress:
                 task_progress[task_id]["status"] = "error"
                 task_progress[task_id]["error"] = str(e)
+                _notify_progress(task_id)
+            task_events.pop(task_id, None)
             raise HTTPException(status_code=500, detail=f"处理视频时出错: {str(e)}")
 
 
@@ -298,18 +347,47 @@ async def video_progress(task_id: str):
     """SSE推送视频处理进度"""
 
     async def event_generator():
-        while True:
-            if task_id not in task_progress:
-                yield f"data: {json.dumps({'error': '任务不存在'})}\n\n"
-                break
-
-            progress_data = task_progress[task_id].copy()
-            yield f"data: {json.dumps(progress_data)}\n\n"
-
-            if progress_data.get("status") in ["completed", "error"]:
-                break
-
-            await asyncio.sleep(0.5)
+        # 本连接独占的唤醒事件
+        event = asyncio.Event()
+        waiter = task_events.get(task_id)
+        subscribers = waiter[1] if waiter is not None else None
+        if subscribers is not None:
+            subscribers.add(event)
+        try:
+            while True:
+                if task_id not in task_progress:
+                    yield f"data: {json.dumps({'error': '任务不存在'})}\n\n"
+                    break
+
+                # 先清除事件再读取快照，读取之后发生的变化会再次触发事件，不会丢失
+                event.clear()
+                progress_data = task_progress[task_id].copy()
+                yield f"data: {json.dumps(progress_data)}\n\n"
+
+                if progress_data.get("status") in ["completed", "error"]:
+                    break
+
+                if subscribers is None:
+                    await asyncio.sleep(0.5)
+                    continue
+
+                # 等待进度变化；超时则发送心跳注释，防止代理断开空闲连接。
+                # 心跳后重新检查任务状态，即使错过通知也不会一直挂起
+                while True:
+                    try:
+                        await asyncio.wait_for(event.wait(), SSE_HEARTBEAT_SECONDS)
+                        break
+                    except asyncio.TimeoutError:
+                        yield ": keep-alive\n\n"
+                        progress = task_progress.get(task_id)
+                        if progress is None or progress.get("status") in [
+                            "completed",
+                            "error",
+                        ]:
+                            break
+        finally:
+            if subscribers is not None:
+                subscribers.discard(event)
 
     return StreamingResponse(
         event_generator(),
@@ -1,167 +1,320 @@
 import os
-import cv2
+import re
 import subprocess
 import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from typing import Optional, Callable
 from utils import get_ffmpeg_path, ensure_dir
 from tqdm import tqdm
-from image import process_folder
+from image import process_raw_stream
 from pathlib import Path
 
 FFMPEG_PATH = get_ffmpeg_path()
 
+# 解码时优先使用硬件加速（NVDEC/QSV/VAAPI/VideoToolbox等），解码后的帧自动拷回内存；
+# 没有可用设备或初始化失败时FFmpeg会自行回退到软件解码
+_HWACCEL_ARGS = ("-hwaccel", "auto")
+
+# 单个FFmpeg进程的最大线程数
+_MAX_FFMPEG_THREADS = 16
+
+# 音频编码参数：优先直接复制，失败时转码为AAC
+_AUDIO_CODEC_ARGS = (
+    ("-c:a", "copy"),
+    ("-c:a", "aac", "-b:a", "128k"),
+)
+
+# 以下为各FFmpeg命令中不随调用变化的部分，模块加载时构建一次；
+# 可执行文件路径不放进模板，调用时读取 FFMPEG_PATH
+
+# H.264编码的固定参数（码率与线程数由 _x264_args 按调用补充）
+_X264_STATIC_ARGS = (
+    "-pix_fmt",
+    "yuv420p",  # 兼容性最好的像素格式
+    "-profile:v",
+    "main",  # 指定H.264 profile
+    "-level",
+    "4.1",  # 指定H.264 level
+)
+
+# 解码器输出：只输出画面，原始RGB帧写入stdout
+_RAW_DECODE_OUTPUT_ARGS = ("-an", "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1")
+
+# 编码器输入：从stdin读取原始RGB帧
+_RAW_ENCODE_INPUT_ARGS = ("-f", "rawvideo", "-pix_fmt", "rgb24")
+
+# 合并音视频：元数据替换与流映射
+_MERGE_MAP_ARGS = (
+    # 🔥🔥🔥 【核心元数据伪装】🔥🔥🔥
+    # 全局元数据只取自ffmetadata文件，源文件的标题、作者、注释等全部丢弃
+    "-map_metadata",
+    "2",
+    # 不复制任何流级元数据
+    "-map_metadata:s:v",
+    "-1",
+    "-map_metadata:s:a",
+    "-1",
+    "-c:v",
+    "copy",
+)
+
+# 合并音视频时写入的全局元数据（ffmetadata格式），未列出的描述性元数据一律不保留
+_FFMETADATA = (
+    ";FFMETADATA1\n"
+    "encoder=Lavf58.20.100\n"  # 伪装成旧版编码器
+    "compatible_brands=isom/iso2/avc1/mp41\n"  # 伪装成H.264标准
+)
+
+
+def _split_threads(threads=None):
+    """
+    把单个视频的线程预算分给解码和编码两个FFmpeg进程，
+    每个进程再从自己的份额中分出1/4给像素格式转换（-filter_threads）
+
+    参数:
+        threads: 本视频可用的线程总数，默认CPU核心数
+
+    返回:
+        ((decode_threads, decode_filter_threads), (encode_threads, encode_filter_threads))，
+        每项至少为1、最多为 _MAX_FFMPEG_THREADS
+    """
+    budget = threads or os.cpu_count() or 1
+    # x264编码远比解码耗时，解码只分1/4，其余给编码
+    decode_share = max(1, budget // 4)
+    encode_share = max(1, budget - decode_share)
+
+    def split(share):
+        filter_threads = max(1, share // 4)
+        codec_threads = max(1, share - filter_threads)
+        return (
+            min(_MAX_FFMPEG_THREADS, codec_threads),
+            min(_MAX_FFMPEG_THREADS, filter_threads),
+        )
+
+    return split(decode_share), split(encode_share)
+
 
-def video_to_frames(
+def _x264_args(preset="faster", bitrate="1800k", crf=None, threads=None):
+    """构建H.264编码参数"""
+    # 码率控制：默认使用目标码率，指定crf时改为恒定质量
+    rate_args = ["-crf", str(crf)] if crf is not None else ["-b:v", bitrate]
+    threads = min(_MAX_FFMPEG_THREADS, threads or os.cpu_count() or 1)
+    return [
+        "-vcodec",
+        "libx264",  # 使用libx264编码器
+        "-threads",
+        str(threads),  # 显式指定编码线程数
+        # 线程数只由 -threads 决定，x264-params 里不再写 threads=，否则会覆盖按视频分配的预算；
+        # lookahead线程取编码线程的1/4（16线程时为4）；关闭按条带多线程，保持帧级并行
+        "-x264-params",
+        f"lookahead-threads={max(1, threads // 4)}:sliced-threads=0",
+        *rate_args,  # 码率控制 (默认1.8Mbps，接近原始码率)
+        "-preset",
+        preset,  # 编码速度与压缩率的平衡
+        *_X264_STATIC_ARGS,
+    ]
+
+
+def _ntsc_fps(fps):
+    """日志中的帧率只保留两位小数，把 23.98/29.97/59.94 等还原为 N*1000/1001"""
+    nominal = round(fps * 1.001)
+    if fps != round(fps) and abs(fps * 1.001 - nominal) < 0.005:
+        return nominal / 1.001
+    return fps
+
+
+def _read_stream_info(stderr):
+    """
+    从FFmpeg解码日志中解析视频信息，替代单独的探测步骤（无需ffprobe或OpenCV）
+
+    返回:
+        (width, height, fps, total_frames)，宽高取自输出流（已包含自动旋转）；
+        无法解析时返回 None；时长未知时 total_frames 为0
+    """
+    duration = None
+    in_output = False
+    for raw_line in iter(stderr.readline, b""):
+        line = raw_line.decode("utf-8", errors="replace")
+        match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", line)
+        if match and duration is None:
+            hours, minutes, seconds = match.groups()
+            duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+        if line.startswith("Output #0"):
+            in_output = True
+        elif in_output and "Video:" in line:
+            size = re.search(r", (\d+)x(\d+)", line)
+            rate = re.search(r", (\d+(?:\.\d+)?)(k?) fps", line)
+            if size is None or rate is None:
+                return None
+            fps = float(rate.group(1)) * (1000 if rate.group(2) else 1)
+            fps = _ntsc_fps(fps)
+            total_frames = round(duration * fps) if duration else 0
+            return int(size.group(1)), int(size.group(2)), fps, total_frames
+    return None
+
+
+def _drain(stream):
+    """持续读取并丢弃管道内容，防止子进程因管道写满而阻塞"""
+    for _ in iter(lambda: stream.read(65536), b""):
+        pass
+
+
+def process_video_streaming(
     video_path,
-    output_folder,
-    frame_prefix="frame_",
+    output_video,
+    perturb_prob=0.01,
+    visual_debug=False,
     progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    preset="faster",
+    bitrate="1800k",
+    crf=None,
+    threads=None,
 ):
     """
-    将视频分解为帧序列（使用FFmpeg，性能更优）
+    流式处理视频画面：FFmpeg解码 -> 原始RGB帧管道 -> 扰动 -> 管道 -> FFmpeg编码
+
+    帧不落盘，省去中间帧序列的编码、解码和磁盘读写；输出视频不含音频
 
     参数:
         video_path: 输入视频路径
-        output_folder: 输出帧序列保存文件夹
-        frame_prefix: 帧文件名前缀
+        output_video: 输出视频路径
+        perturb_prob: 像素被扰动的概率(0-1之间，默认0.01即1%)
+        visual_debug: 是否启用可视化调试模式
         progress_callback: 进度回调函数，接收参数 (current: int, total: int, info: str) -> None
-    """
-    ensure_dir(output_folder)
-
-    # 先用cv2快速获取视频信息
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print(f"无法打开视频文件: {video_path}")
-        return None, None
+        preset: x264编码预设
+        bitrate: 目标视频码率，crf为None时生效
+        crf: 恒定质量模式的CRF值，指定后替代目标码率
+        threads: 本视频可用的线程总数，按 _split_threads 分给解码和编码，默认CPU核心数
 
-    # 获取视频信息
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    cap.release()
-
-    print(f"视频信息: {os.path.basename(video_path)}")
-    print(f"帧率: {fps:.2f} FPS, 总帧数: {total_frames}")
-
-    # 使用FFmpeg批量提取所有帧（性能更优）
-    print("使用FFmpeg提取帧序列...")
-    output_pattern = os.path.join(output_folder, f"{frame_prefix}%06d.jpg")
+    返回:
+        (fps, total_frames)，失败时返回 (None, None)
+    """
+    decode_split, encode_split = _split_threads(threads)
+    decode_threads, decode_filter_threads = decode_split
+    encode_threads, encode_filter_threads = encode_split
 
-    cmd = [
+    decode_cmd = [
         FFMPEG_PATH,
+        "-hide_banner",
+        "-nostats",
+        # 输出rgb24需要一次隐式的yuv->rgb像素格式转换（swscale），由 -filter_threads 控制
+        "-filter_threads",
+        str(decode_filter_threads),
+        *_HWACCEL_ARGS,
+        "-threads",
+        str(decode_threads),
         "-i",
         video_path,
-        "-q:v",
-        "2",  # JPEG质量（2=高质量）
-        "-y",  # 覆盖输出文件
-        output_pattern,
+        *_RAW_DECODE_OUTPUT_ARGS,
     ]
 
+    decoder = None
+    encoder = None
     try:
-        # 实时解析FFmpeg输出获取进度
-        process = subprocess.Popen(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, bufsize=1
+        decoder = subprocess.Popen(
+            decode_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
+        # 帧尺寸和帧率以解码输出为准（已处理旋转等元数据），总帧数由时长估算，仅用于进度
+        info = _read_stream_info(decoder.stderr)
+        threading.Thread(target=_drain, args=(decoder.stderr,), daemon=True).start()
+        if info is None:
+            print(f"无法打开视频文件: {video_path}")
+            return None, None
+        width, height, fps, total_frames = info
+
+        print(f"视频信息: {os.path.basename(video_path)}")
+        print(f"帧率: {fps:.2f} FPS, 总帧数: {total_frames}")
 
-        # 解析FFmpeg stderr输出获取进度
-        for line in process.stderr:
-            if "frame=" in line:
+        encode_cmd = [
+            FFMPEG_PATH,
+            "-y",  # 覆盖输出文件
+            "-loglevel",
+            "error",
+            # 编码前同样有一次隐式的rgb24->yuv420p转换
+            "-filter_threads",
+            str(encode_filter_threads),
+            *_RAW_ENCODE_INPUT_ARGS,
+            "-s",
+            f"{width}x{height}",  # 原始帧没有头信息，必须指定尺寸
+            "-framerate",
+            str(fps),  # 设置输入帧率
+            "-i",
+            "pipe:0",
+            *_x264_args(preset, bitrate, crf, encode_threads),
+            output_video,
+        ]
+        # 编码日志写入临时文件，避免管道写满导致死锁
+        with tempfile.TemporaryFile() as encoder_log:
+            encoder = subprocess.Popen(
+                encode_cmd, stdin=subprocess.PIPE, stderr=encoder_log
+            )
+            try:
+                frame_count = process_raw_stream(
+                    decoder.stdout,
+                    encoder.stdin,
+                    width,
+                    height,
+                    perturb_prob=perturb_prob,
+                    visual_debug=visual_debug,
+                    progress_callback=progress_callback,
+                    total_frames=total_frames,
+                )
+            except BrokenPipeError:
+                # 编码器提前退出（如尺寸不被yuv420p接受），原因见编码日志
+                frame_count = None
+            finally:
                 try:
-                    # 提取帧号: frame=  123
-                    frame_str = line.split("frame=")[1].split()[0]
-                    current_frame = int(frame_str)
-                    if progress_callback:
-                        progress_callback(
-                            min(current_frame, total_frames),
-                            total_frames,
-                            "分解视频为帧",
-                        )
-                except (ValueError, IndexError):
+                    encoder.stdin.close()
+                except BrokenPipeError:
                     pass
-
-        process.wait()
-
-        if process.returncode != 0:
-            print("FFmpeg提取失败")
+            encoder.wait()
+            if frame_count is None:
+                decoder.kill()  # 不再读取解码输出，避免解码器阻塞在写满的管道上
+            decoder.wait()
+
+            if encoder.returncode != 0 or frame_count is None:
+                encoder_log.seek(0)
+                error_output = encoder_log.read().decode("utf-8", errors="replace")
+                print(f"视频合成失败: {error_output}")
+                return None, None
+
+        if decoder.returncode != 0 or frame_count == 0:
+            print("FFmpeg解码失败")
             return None, None
 
-        # 统计实际提取的帧数
-        frame_files = [
-            f
-            for f in os.listdir(output_folder)
-            if f.startswith(frame_prefix) and f.endswith(".jpg")
-        ]
-        actual_frame_count = len(frame_files)
-
-        print(f"视频分解完成! 共提取 {actual_frame_count} 帧图像")
-        return fps, total_frames
+        print(
+            f"视频画面处理完成! 共处理 {frame_count} 帧, "
+            f"保存到 {os.path.basename(output_video)}"
+        )
+        return fps, frame_count
 
     except Exception as e:
-        print(f"使用FFmpeg提取帧时出错: {e}")
+        print(f"流式处理视频时出错: {e}")
         return None, None
+    finally:
+        for process in (decoder, encoder):
+            if process is not None and process.poll() is None:
+                process.kill()
+                process.wait()
 
 
-def frames_to_video(frames_folder, output_video, fps=30, frame_prefix="frame_"):
-    """
-    使用ffmpeg将帧序列合成为视频 (H.264编码)
+def _run_ffmpeg(cmd):
     """
-    # 获取所有帧文件
-    frame_files = [
-        f
-        for f in os.listdir(frames_folder)
-        if f.startswith(frame_prefix) and f.lower().endswith((".jpg", ".jpeg", ".png"))
-    ]
-    frame_files.sort()
-    if not frame_files:
-        print(f"在 {frames_folder} 中未找到帧文件")
-        return False
+    运行FFmpeg命令，stdout丢弃，stderr写入临时文件而不是管道
 
-    # 获取第一帧的尺寸
-    first_frame = cv2.imread(os.path.join(frames_folder, frame_files[0]))
-    if first_frame is None:
-        print("无法读取第一帧")
-        return False
-    height, width, _ = first_frame.shape
-
-    # 构建ffmpeg命令
-    cmd = [
-        FFMPEG_PATH,
-        "-y",  # 覆盖输出文件
-        "-r",
-        str(fps),  # 设置输入帧率
-        "-f",
-        "image2",  # 输入格式为图片序列
-        "-s",
-        f"{width}x{height}",  # 指定图像尺寸
-        "-i",
-        os.path.join(frames_folder, f"{frame_prefix}%06d.jpg"),  # 输入图片路径
-        "-vcodec",
-        "libx264",  # 使用libx264编码器
-        "-b:v",
-        "1800k",  # 设置目标视频码率 (这里设为1.8Mbps，接近原始码率)
-        "-pix_fmt",
-        "yuv420p",  # 兼容性最好的像素格式
-        "-preset",
-        "medium",  # 编码速度与压缩率的平衡
-        "-profile:v",
-        "main",  # 指定H.264 profile
-        "-level",
-        "4.1",  # 指定H.264 level
-        output_video,
-    ]
-
-    try:
-        result = subprocess.run(
-            cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
-        )
-        if result.returncode == 0:
-            print(f"视频合成完成! 保存到 {os.path.basename(output_video)}")
-            return True
-        else:
-            print(f"视频合成失败: {result.stderr}")
-            return False
-    except Exception as e:
-        print(f"执行ffmpeg命令时出错: {e}")
-        return False
+    返回:
+        (returncode, stderr字节串)
+    """
+    # 管道需要Python端持续读取，否则日志写满缓冲区后FFmpeg会阻塞；
+    # 临时文件由操作系统缓冲，进程结束后再一次性读回
+    with tempfile.TemporaryFile() as err:
+        returncode = subprocess.run(
+            cmd, stdout=subprocess.DEVNULL, stderr=err
+        ).returncode
+        err.seek(0)
+        return returncode, err.read()
 
 
 def extract_video_audio(video_path, audio_output_path):
@@ -175,20 +328,29 @@ def extract_video_audio(video_path, audio_output_path):
     try:
         # 提取音频
         print("提取视频音频...")
-        extract_cmd = [
-            FFMPEG_PATH,
-            "-i",
-            video_path,
-            "-vn",
-            "-acodec",
-            "copy",
-            audio_output_path,
-            "-y",
-        ]
-        result = subprocess.run(
-            extract_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
-        )
-        has_audio = result.returncode == 0
+        has_audio = False
+        # 优先直接复制音频流；源音频不是AAC时（.aac容器只接受AAC）转码一次，
+        # 保证输出始终是AAC，合并阶段即可直接复制
+        for codec_args in _AUDIO_CODEC_ARGS:
+            extract_cmd = [
+                FFMPEG_PATH,
+                "-loglevel",
+                "error",  # 只记录错误，用于判断是否没有音频流
+                "-i",
+                video_path,
+                "-vn",
+                "-map",
+                "0:a:0",
+                *codec_args,
+                audio_output_path,
+                "-y",
+            ]
+            returncode, stderr = _run_ffmpeg(extract_cmd)
+            if returncode == 0:
+                has_audio = True
+                break
+            if b"matches no streams" in stderr:
+                break  # 视频没有音频流，无需再转码重试
 
         if has_audio:
             print("音频提取成功")
@@ -213,60 +375,50 @@ def merge_video_audio(video_path, audio_path, output_path):
         audio_path: 音频文件路径
         output_path: 输出文件路径
     """
+    metadata_path = None
     try:
-        merge_cmd = [
-            FFMPEG_PATH,
-            "-i",
-            video_path,
-            "-i",
-            audio_path,
-            "-c:v",
-            "copy",
-            "-c:a",
-            "aac",
-            "-map",
-            "0:v:0",
-            "-map",
-            "1:a:0",
-            "-shortest",
-            # 🔥🔥🔥 【核心元数据伪装】🔥🔥🔥
-            # 1. 技术伪装
-            "-metadata",
-            "encoder=Lavf58.20.100",  # 伪装成旧版编码器
-            "-metadata",
-            "compatible_brands=isom/iso2/avc1/mp41",  # 伪装成H.264标准
-            # 2. 清空所有描述性元数据
-            "-metadata",
-            "title=",  # 清空标题
-            "-metadata",
-            "artist=",  # 清空作者
-            "-metadata",
-            "album=",  # 清空专辑
-            "-metadata",
-            "date=",  # 清空日期
-            "-metadata",
-            "genre=",  # 清空流派
-            "-metadata",
-            "comment=",  # 清空注释
-            "-metadata",
-            "description=",  # 清空描述
-            "-metadata",
-            "copyright=",  # 清空版权
-            "-metadata",
-            "encoded_by=",  # 清空编码者
-            "-metadata",
-            "creation_time=",  # 清空创建时间 (FFmpeg会自动写入新的)
-            "-y",
-            output_path,
-        ]
-        subprocess.run(
-            merge_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
-        )
-        print(f"音频合并成功: {os.path.basename(output_path)}")
-        return True
+        # 元数据写入单独的ffmetadata文件，作为第3个输入一次性替换全部全局元数据
+        fd, metadata_path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(_FFMETADATA)
+
+        # 音频为AAC时直接复制，避免AAC->AAC的有损重编码；复制失败再转码
+        for codec_args in _AUDIO_CODEC_ARGS:
+            merge_cmd = [
+                FFMPEG_PATH,
+                "-loglevel",
+                "error",
+                "-i",
+                video_path,
+                "-i",
+                audio_path,
+                "-f",
+                "ffmetadata",
+                "-i",
+                metadata_path,
+                *_MERGE_MAP_ARGS,
+                *codec_args,
+                "-map",
+                "0:v:0",
+                "-map",
+                "1:a:0",
+                "-shortest",
+                "-y",
+                output_path,
+            ]
+            returncode, stderr = _run_ffmpeg(merge_cmd)
+            if returncode == 0:
+                print(f"音频合并成功: {os.path.basename(output_path)}")
+                return True
+
+        print(f"合并音频时出错: {stderr.decode('utf-8', errors='replace')}")
+        return False
     except Exception as e:
         print(f"合并音频时出错: {e}")
         return False
+    finally:
+        if metadata_path and os.path.exists(metadata_path):
+            os.remove(metadata_path)
 
 
 def main(
@@ -286,7 +438,7 @@ def main(
         perturb_prob: 像素被扰动的概率(0-1之间，默认0.01即1%)
         visual_debug: 是否启用可视化调试模式
         progress_callback: 进度回调函数，接收参数 (current: int, total: int, info: str) -> None
-        max_workers: 最大工作进程数，默认使用CPU核心数
+        max_workers: 本视频可用的CPU核心数，由解码和编码进程分摊，默认CPU核心数
 
     返回:
         dict: 处理结果字典，包含:
@@ -300,8 +452,6 @@ def main(
     # 使用输出文件名（不含扩展名）创建独立的临时目录，避免多任务冲突
     output_basename = os.path.splitext(os.path.basename(output_video_path))[0]
     catch_dir = os.path.join(output_dir, f"catch_{output_basename}")
-    frames_dir = os.path.join(catch_dir, "frames")  # 原始帧序列
-    processed_frames_dir = os.path.join(catch_dir, "processed_frames")  # 处理后的帧序列
     audio_path = os.path.join(catch_dir, "audio.aac")  # 音频
     temp_video = os.path.join(catch_dir, "temp_video.mp4")  # 临时视频
 
@@ -313,24 +463,25 @@ def main(
     }
 
     try:
-        fps, total_frames = video_to_frames(
-            input_video_path, frames_dir, progress_callback=progress_callback
-        )  # 将视频分解为帧序列
-        if fps is None or total_frames is None:
-            raise Exception("视频分解为帧序列失败")
-
-        process_folder(
-            frames_dir,
-            processed_frames_dir,
-            perturb_prob=perturb_prob,
-            visual_debug=visual_debug,
-            progress_callback=progress_callback,
-            max_workers=max_workers,
-        )
-        has_audio = extract_video_audio(input_video_path, audio_path)  # 提取音频
-
-        if not frames_to_video(processed_frames_dir, temp_video, fps=fps):  # 将帧序列合成为视频
-            raise Exception("帧序列合成视频失败")
+        ensure_dir(catch_dir)
+        # 音频提取与画面处理互不依赖，放到后台线程与画面处理同时进行；
+        # 退出with时会等待提取结束，失败分支删除临时目录前不会有文件仍在写入
+        with ThreadPoolExecutor(max_workers=1) as audio_executor:
+            audio_future = audio_executor.submit(
+                extract_video_audio, input_video_path, audio_path
+            )  # 提取音频
+            fps, total_frames = process_video_streaming(
+                input_video_path,
+                temp_video,
+                perturb_prob=perturb_prob,
+                visual_debug=visual_debug,
+                progress_callback=progress_callback,
+                threads=max_workers,
+            )  # 解码、扰动、编码一次完成，帧不落盘
+            if fps is None or total_frames is None:
+                raise Exception("视频画面处理失败")
+
+            has_audio = audio_future.result()
 
         if has_audio:
             if not merge_video_audio(temp_video, audio_path, output_video_path):  # 合并视频和音频
@@ -355,6 +506,73 @@ def main(
         return result
 
 
+def process_videos(
+    video_pairs,
+    perturb_prob=0.01,
+    visual_debug=False,
+    progress_callback=None,
+    max_concurrent=None,
+):
+    """
+    批量处理多个视频，每个视频在独立进程中完整执行 main 流程
+
+    多个视频整体并行比在单个视频内部并行扩展性更好（FFmpeg启动、磁盘IO等阶段无法在单个视频内并行）
+
+    参数:
+        video_pairs: [(input_video_path, output_video_path), ...]
+        perturb_prob: 像素被扰动的概率(0-1之间，默认0.01即1%)
+        visual_debug: 是否启用可视化调试模式
+        progress_callback: 进度回调函数，每完成一个视频调用一次，接收参数 (current: int, total: int, info: str) -> None
+        max_concurrent: 同时处理的视频数，默认CPU核心数的1/4
+
+    返回:
+        list[dict]: 与 video_pairs 顺序一致的 main 处理结果
+    """
+    video_pairs = list(video_pairs)
+    total = len(video_pairs)
+    if total == 0:
+        return []
+
+    cpu_count = os.cpu_count() or 1
+    if max_concurrent is None:
+        max_concurrent = max(1, cpu_count // 4)
+    max_concurrent = min(max_concurrent, total)
+    # 每个视频分到的核心数，避免多个视频同时运行时过度超订CPU
+    inner_workers = max(1, cpu_count // max_concurrent)
+
+    results = [None] * total
+    with ProcessPoolExecutor(max_workers=max_concurrent) as executor:
+        future_to_index = {
+            executor.submit(
+                main,
+                input_video_path,
+                output_video_path,
+                perturb_prob=perturb_prob,
+                visual_debug=visual_debug,
+                max_workers=inner_workers,
+            ): index
+            for index, (input_video_path, output_video_path) in enumerate(video_pairs)
+        }
+
+        completed_count = 0
+        for future in as_completed(future_to_index):
+            index = future_to_index[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:
+                results[index] = {
+                    "success": False,
+                    "output_path": video_pairs[index][1],
+                    "metadata": {},
+                    "error": str(e),
+                }
+            completed_count += 1
+            if progress_callback:
+                progress_callback(completed_count, total, "处理视频")
+
+    return results
+
+
 if __name__ == "__main__":
     BASE = Path(__file__).parent
     input_video_path = BASE / "public" / "3.mp4"